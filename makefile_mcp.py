@@ -15,7 +15,9 @@ Usage: uv run makefile_mcp.py [--makefile PATH] [--include TARGET1,TARGET2] [--e
 """
 
 import argparse
-import os
+import array
+import bisect
+import functools
 import pathlib
 import re
 import shlex
@@ -23,13 +25,23 @@ import subprocess
 import sys
 import threading
 import time
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Set
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional, Set, Tuple
 
 from fastmcp import FastMCP
 
 
-@dataclass
+def _line_offsets(text: str) -> array.array:
+    """Offsets of every newline in text, for slicing lines without splitting."""
+    offsets = array.array("q")
+    pos = text.find("\n")
+    while pos >= 0:
+        offsets.append(pos)
+        pos = text.find("\n", pos + 1)
+    return offsets
+
+
+@dataclass(slots=True)
 class CachedExecution:
     """Cached output from a make target execution."""
 
@@ -41,6 +53,53 @@ class CachedExecution:
     exit_code: int
     timestamp: float
 
+    # Lazily built per-stream views: newline-offset indexes so repeated
+    # pagination does not rescan the whole output, and casefolded copies so
+    # repeated case-insensitive searches fold the text only once.
+    _stdout_offsets: Optional[array.array] = field(default=None, init=False, repr=False)
+    _stderr_offsets: Optional[array.array] = field(default=None, init=False, repr=False)
+    _stdout_folded: Optional[str] = field(default=None, init=False, repr=False)
+    _stderr_folded: Optional[str] = field(default=None, init=False, repr=False)
+    _stdout_lines: Optional[Tuple[str, ...]] = field(default=None, init=False, repr=False)
+    _stderr_lines: Optional[Tuple[str, ...]] = field(default=None, init=False, repr=False)
+
+    def line_offsets(self, stream: str) -> array.array:
+        """Newline offsets for 'stdout' or 'stderr', computed once per entry."""
+        attr = "_stdout_offsets" if stream == "stdout" else "_stderr_offsets"
+        offsets = getattr(self, attr)
+        if offsets is None:
+            text = self.stdout if stream == "stdout" else self.stderr
+            offsets = _line_offsets(text)
+            setattr(self, attr, offsets)
+        return offsets
+
+    def lines(self, stream: str) -> Tuple[str, ...]:
+        """Newline-split lines of 'stdout' or 'stderr', computed once per entry.
+
+        Split on '\\n' only, so indexes agree with the offset index above; a
+        trailing newline does not contribute an empty final line.
+        """
+        attr = "_stdout_lines" if stream == "stdout" else "_stderr_lines"
+        lines = getattr(self, attr)
+        if lines is None:
+            text = self.stdout if stream == "stdout" else self.stderr
+            parts = text.split("\n")
+            if parts and parts[-1] == "":
+                parts.pop()
+            lines = tuple(parts)
+            setattr(self, attr, lines)
+        return lines
+
+    def casefolded(self, stream: str) -> str:
+        """Casefolded copy of 'stdout' or 'stderr', computed once per entry."""
+        attr = "_stdout_folded" if stream == "stdout" else "_stderr_folded"
+        folded = getattr(self, attr)
+        if folded is None:
+            text = self.stdout if stream == "stdout" else self.stderr
+            folded = text.casefold()
+            setattr(self, attr, folded)
+        return folded
+
 
 class OutputCache:
     """Cache for make target execution outputs with eviction.
@@ -72,10 +131,10 @@ class OutputCache:
             )
             self._cache[execution_id] = entry
 
-            # Evict oldest entries if over limit
+            # Evict oldest entries if over limit. IDs are assigned in insertion
+            # order and dicts preserve it, so the first key is always oldest.
             while len(self._cache) > self.max_entries:
-                oldest_id = min(self._cache.keys())
-                del self._cache[oldest_id]
+                del self._cache[next(iter(self._cache))]
 
             return entry
 
@@ -93,6 +152,20 @@ class OutputCache:
 MAKEFILE_PATH = None
 WORKING_DIR = None
 
+# Characters permitted in the target list before the colon of a rule line.
+# Space is included because a single rule may declare several targets, e.g.
+# "start stop restart:". '%' is deliberately absent so pattern rules never
+# match, and recipe lines fail on their leading tab.
+_TARGET_LIST_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_.- ")
+
+
+def parse_target_filter(value: Optional[str]) -> Optional[FrozenSet[str]]:
+    """Split a comma-separated target list into a frozenset, built exactly once
+    per configuration so membership tests never re-split the raw string."""
+    if not value:
+        return None
+    return frozenset(target.strip() for target in value.split(","))
+
 
 def positive_int(value: str) -> int:
     """Parse a strictly positive integer for CLI limits."""
@@ -102,9 +175,12 @@ def positive_int(value: str) -> int:
     return parsed_value
 
 
-def parse_cli_args(strict=False):
+def parse_cli_args(strict=False, argv=None):
     """
     Parse command-line arguments for Makefile configuration.
+    Args:
+        strict: Reject unknown arguments instead of ignoring them.
+        argv: Argument list to parse instead of sys.argv[1:].
     Returns:
         argparse.Namespace: Parsed arguments.
     """
@@ -131,9 +207,9 @@ def parse_cli_args(strict=False):
     )
 
     if strict:
-        return parser.parse_args()
+        return parser.parse_args(argv)
 
-    known_args, _ = parser.parse_known_args()
+    known_args, _ = parser.parse_known_args(argv)
     return known_args
 
 
@@ -144,21 +220,18 @@ def initialize_makefile_mcp():
     # Parse CLI arguments
     cli_args = parse_cli_args(strict=True)
 
-    # Resolve Makefile path
-    if os.path.isabs(cli_args.makefile):
-        MAKEFILE_PATH = pathlib.Path(cli_args.makefile)
-    else:
-        MAKEFILE_PATH = pathlib.Path.cwd() / cli_args.makefile
+    # Resolve the Makefile path once; relative paths resolve against the cwd.
+    MAKEFILE_PATH = pathlib.Path(cli_args.makefile).resolve()
 
     if not MAKEFILE_PATH.exists():
         print(f"Error: Makefile not found at {MAKEFILE_PATH}", file=sys.stderr)
         sys.exit(1)
 
-    # Set working directory
+    # Set working directory; the Makefile's parent is already canonical.
     if cli_args.working_dir:
         WORKING_DIR = pathlib.Path(cli_args.working_dir).resolve()
     else:
-        WORKING_DIR = MAKEFILE_PATH.parent.resolve()
+        WORKING_DIR = MAKEFILE_PATH.parent
 
     if not WORKING_DIR.is_dir():
         print(f"Error: Working directory not found: {WORKING_DIR}", file=sys.stderr)
@@ -173,24 +246,16 @@ if __name__ == "__main__":
 else:
     # For imports (like tests), set up defaults without validation
     cli_args = parse_cli_args()
-    if os.path.isabs(cli_args.makefile):
-        MAKEFILE_PATH = pathlib.Path(cli_args.makefile)
-    else:
-        MAKEFILE_PATH = pathlib.Path.cwd() / cli_args.makefile
+    MAKEFILE_PATH = pathlib.Path(cli_args.makefile).resolve()
 
     if cli_args.working_dir:
         WORKING_DIR = pathlib.Path(cli_args.working_dir).resolve()
     else:
-        WORKING_DIR = MAKEFILE_PATH.parent.resolve() if MAKEFILE_PATH.exists() else pathlib.Path.cwd()
+        WORKING_DIR = MAKEFILE_PATH.parent if MAKEFILE_PATH.exists() else pathlib.Path.cwd()
 
 # Parse include/exclude lists
-INCLUDE_TARGETS: Optional[Set[str]] = None
-if cli_args.include:
-    INCLUDE_TARGETS = {target.strip() for target in cli_args.include.split(",")}
-
-EXCLUDE_TARGETS: Set[str] = set()
-if cli_args.exclude:
-    EXCLUDE_TARGETS = {target.strip() for target in cli_args.exclude.split(",")}
+INCLUDE_TARGETS: Optional[FrozenSet[str]] = parse_target_filter(cli_args.include)
+EXCLUDE_TARGETS: FrozenSet[str] = parse_target_filter(cli_args.exclude) or frozenset()
 
 # MCP Server instance
 mcp_server = FastMCP("MakefileMCP")
@@ -204,19 +269,16 @@ class MakefileParser:
 
     def __init__(self, makefile_path: pathlib.Path):
         self.makefile_path = makefile_path
-        self.targets: Dict[str, str] = {}
-        self._parse()
+        self._targets: Optional[Dict[str, str]] = None
 
-    def _parse(self):
-        """Parse the Makefile to extract targets and their descriptions."""
+    def _iter_parse(self) -> Iterator[Tuple[str, str]]:
+        """Parse the Makefile, yielding (target, description) as found."""
         try:
-            with open(self.makefile_path, "r", encoding="utf-8") as f:
-                content = f.read()
+            content = self.makefile_path.read_text(encoding="utf-8")
         except UnicodeDecodeError:
-            with open(self.makefile_path, "r", encoding="latin-1") as f:
-                content = f.read()
+            content = self.makefile_path.read_text(encoding="latin-1")
 
-        lines = content.split("\n")
+        lines = content.splitlines()
         current_comment = ""
 
         for _i, line in enumerate(lines):
@@ -234,56 +296,99 @@ class MakefileParser:
                 current_comment = ""
                 continue
 
-            # Look for target definitions (target: dependencies). A single rule
-            # may declare several space-separated targets, e.g. "start stop restart:".
-            target_match = re.match(r"^([a-zA-Z0-9_.-][a-zA-Z0-9_.\- ]*?)\s*:(?![:=])", line)
-            if target_match:
-                for target_name in target_match.group(1).split():
-                    # Skip special targets that start with . or contain %
-                    if target_name.startswith(".") or "%" in target_name:
-                        continue
-
-                    # Apply the preceding comment to every target on the rule,
-                    # or generate a default description per target.
-                    if current_comment:
-                        description = current_comment
-                    else:
-                        description = f"Execute the '{target_name}' target"
-
-                    self.targets[target_name] = description
-
-                current_comment = ""
-                continue
+            # Look for target definitions (target: dependencies). A manual scan
+            # rather than a regex: locate the first ':', reject '::' rules and
+            # ':='/'::=' assignments, and require every character before the
+            # colon to be a valid target-list character.
+            colon = line.find(":")
+            if colon > 0 and line[colon + 1 : colon + 2] not in (":", "="):
+                names = line[:colon].rstrip()
+                if names and names[0] != " " and all(ch in _TARGET_LIST_CHARS for ch in names):
+                    for target_name in names.split():
+                        # Skip special targets that start with .
+                        if target_name.startswith("."):
+                            continue
+
+                        # Apply the preceding comment to every target on the rule,
+                        # or generate a default description per target.
+                        if current_comment:
+                            description = current_comment
+                        else:
+                            description = f"Execute the '{target_name}' target"
+
+                        yield target_name, description
+
+                    current_comment = ""
+                    continue
 
             # If line doesn't start with tab/space, reset comment
             if line and not line.startswith(("\t", " ")):
                 current_comment = ""
 
+    def _parsed(self) -> Dict[str, str]:
+        """The full parse, materialized once per parser and reused after."""
+        if self._targets is None:
+            self._targets = dict(self._iter_parse())
+        return self._targets
+
+    def iter_targets(self) -> Iterator[Tuple[str, str]]:
+        """Yield (target, description) pairs in Makefile order.
+
+        Backed by the cached parse: when a target is defined by several rules,
+        the last rule's description wins, exactly as in get_targets().
+        """
+        yield from self._parsed().items()
+
     def get_targets(self) -> Dict[str, str]:
         """Get all discovered targets with their descriptions."""
-        return self.targets.copy()
+        return self._parsed().copy()
 
     def get_filtered_targets(self, include: Optional[Set[str]], exclude: Set[str]) -> Dict[str, str]:
-        """Get targets filtered by include/exclude lists."""
-        targets = self.get_targets()
+        """Get targets filtered by include/exclude lists. Exclusion wins."""
+        inc = None if include is None else frozenset(include)
+        exc = frozenset(exclude or ())
+
+        if inc is None and not exc:
+            return self.get_targets()
+
+        # Single pass over the cached parse; the exclude test short-circuits
+        # the include test.
+        return {name: desc for name, desc in self._parsed().items() if name not in exc and (inc is None or name in inc)}
+
 
-        # Apply include filter
-        if include is not None:
-            targets = {name: desc for name, desc in targets.items() if name in include}
+# Parsed Makefiles keyed by path, each with the stat signature that produced
+# the parse. An unchanged file is parsed once per process rather than on every
+# MCP tool call.
+_PARSE_CACHE: Dict[str, tuple] = {}
 
-        # Apply exclude filter
-        if exclude:
-            targets = {name: desc for name, desc in targets.items() if name not in exclude}
 
-        return targets
+def _cached_parser(makefile_path: pathlib.Path) -> Optional[MakefileParser]:
+    """Return a parser for the path, reusing the cached parse while the file's
+    (mtime, size) signature is unchanged. Returns None if the file cannot be
+    stat'd, so callers degrade to zero targets instead of raising."""
+    key = str(makefile_path)
+    try:
+        st = makefile_path.stat()
+    except OSError:
+        _PARSE_CACHE.pop(key, None)
+        return None
+
+    signature = (st.st_mtime_ns, st.st_size)
+    cached = _PARSE_CACHE.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    parser = MakefileParser(makefile_path)
+    _PARSE_CACHE[key] = (signature, parser)
+    return parser
 
 
 def get_makefile_targets():
     """Parse the Makefile and return filtered targets."""
-    if not MAKEFILE_PATH or not MAKEFILE_PATH.exists():
+    parser = _cached_parser(MAKEFILE_PATH) if MAKEFILE_PATH else None
+    if parser is None:
         return {}
 
-    parser = MakefileParser(MAKEFILE_PATH)
     filtered_targets = parser.get_filtered_targets(INCLUDE_TARGETS, EXCLUDE_TARGETS)
 
     if not filtered_targets:
@@ -300,14 +405,32 @@ else:
     filtered_targets = {}
 
 
+def _count_lines(text: str) -> int:
+    """Line count with splitlines semantics, without building the line list."""
+    if not text:
+        return 0
+    return text.count("\n") + (0 if text.endswith("\n") else 1)
+
+
 def _tail_lines(text: str, n: int) -> tuple[str, bool]:
-    """Return the last n lines of text. Returns (tail_text, was_truncated)."""
+    """Return the last n lines of text. Returns (tail_text, was_truncated).
+
+    Walks backwards from the end counting newlines, so the cost is bounded by
+    the tail rather than the full output.
+    """
     if not text:
         return text, False
-    lines = text.splitlines(keepends=True)
-    if len(lines) <= n:
-        return text, False
-    return "".join(lines[-n:]), True
+
+    # Ignore the trailing newline: it terminates the last line rather than
+    # starting an empty one.
+    idx = len(text) - 1 if text.endswith("\n") else len(text)
+    count = 0
+    while count < n:
+        idx = text.rfind("\n", 0, idx)
+        if idx < 0:
+            return text, False
+        count += 1
+    return text[idx + 1 :], True
 
 
 def _bounded_output_fields(stdout: str, stderr: str, tail_n: int, execution_id: int) -> Dict[str, Any]:
@@ -319,9 +442,9 @@ def _bounded_output_fields(stdout: str, stderr: str, tail_n: int, execution_id:
         "execution_id": execution_id,
         "stdout_tail": stdout_tail,
         "stderr_tail": stderr_tail,
-        "stdout_total_lines": len(stdout.splitlines()),
+        "stdout_total_lines": _count_lines(stdout),
         "stdout_total_chars": len(stdout),
-        "stderr_total_lines": len(stderr.splitlines()),
+        "stderr_total_lines": _count_lines(stderr),
         "stderr_total_chars": len(stderr),
     }
 
@@ -489,15 +612,30 @@ def validate_additional_args(tokens: List[str]) -> Optional[str]:
     return None
 
 
+@functools.lru_cache(maxsize=128)
+def _split_args(additional_args: str) -> Tuple[str, ...]:
+    """Tokenize an additional_args string with shlex, memoized because callers
+    tend to repeat the same few argument strings across invocations."""
+    return tuple(shlex.split(additional_args))
+
+
 def create_make_tool(target_name: str, description: str):
     """Create an MCP tool for a specific make target."""
+    # Bind everything fixed for this target as closure locals: the tool body is
+    # a short hot function, and LOAD_FAST beats repeated global/attribute
+    # lookups there. Snapshotting at creation time matches the docstring below,
+    # which already advertises the paths in effect when the tool was registered.
+    working_dir_str = str(WORKING_DIR)
+    makefile_str = str(MAKEFILE_PATH)
+    tail_n = cli_args.tail_lines
+    cache_add = output_cache.add
 
     def make_target(additional_args: Optional[str] = None, dry_run: bool = False) -> Dict[str, Any]:
         """Execute the make target with optional arguments and dry-run capability."""
         extra_args: List[str] = []
         if additional_args:
             try:
-                extra_args = shlex.split(additional_args)
+                extra_args = list(_split_args(additional_args))
             except ValueError as e:
                 return {
                     "target": target_name,
@@ -517,14 +655,18 @@ def create_make_tool(target_name: str, description: str):
 
         try:
             # Build the make command
-            cmd = ["make", "-C", str(WORKING_DIR), "-f", str(MAKEFILE_PATH), target_name]
+            cmd = ["make", "-C", working_dir_str, "-f", makefile_str, target_name]
 
             if dry_run:
                 cmd.append("-n")  # Dry run flag for make
 
             cmd.extend(extra_args)
 
-            # Execute the command - safe execution with list of args, no shell injection risk
+            # Execute the command - safe execution with list of args, no shell injection risk.
+            # Output is buffered in full by design: get_output/search_output promise the
+            # complete output from the cache, and the timeout path below depends on
+            # TimeoutExpired carrying whatever was captured before the kill, so a
+            # bounded streaming reader cannot replace this without dropping either.
             result = subprocess.run(  # noqa: S603
                 cmd,
                 capture_output=True,
@@ -534,7 +676,7 @@ def create_make_tool(target_name: str, description: str):
 
             # Cache full output
             command_str = " ".join(cmd)
-            cached = output_cache.add(
+            cached = cache_add(
                 target=target_name,
                 command=command_str,
                 stdout=result.stdout,
@@ -545,9 +687,9 @@ def create_make_tool(target_name: str, description: str):
             response = {
                 "target": target_name,
                 "command": command_str,
-                "working_directory": str(WORKING_DIR),
+                "working_directory": working_dir_str,
                 "exit_code": result.returncode,
-                **_bounded_output_fields(result.stdout, result.stderr, cli_args.tail_lines, cached.execution_id),
+                **_bounded_output_fields(result.stdout, result.stderr, tail_n, cached.execution_id),
             }
 
             if dry_run:
@@ -568,7 +710,7 @@ def create_make_tool(target_name: str, description: str):
             partial_stdout = _as_text(e.stdout)
             partial_stderr = _as_text(e.stderr)
             command_str = " ".join(cmd)
-            cached = output_cache.add(
+            cached = cache_add(
                 target=target_name,
                 command=command_str,
                 stdout=partial_stdout,
@@ -579,11 +721,11 @@ def create_make_tool(target_name: str, description: str):
             return {
                 "target": target_name,
                 "command": command_str,
-                "working_directory": str(WORKING_DIR),
+                "working_directory": working_dir_str,
                 "status": "error",
                 "message": f"Target '{target_name}' timed out after 5 minutes",
                 "exit_code": -1,
-                **_bounded_output_fields(partial_stdout, partial_stderr, cli_args.tail_lines, cached.execution_id),
+                **_bounded_output_fields(partial_stdout, partial_stderr, tail_n, cached.execution_id),
             }
         except subprocess.SubprocessError as e:
             return {
@@ -632,12 +774,11 @@ def list_available_targets() -> Dict[str, Any]:
     Returns:
         dict: Information about available targets and server configuration.
     """
+    parser = _cached_parser(MAKEFILE_PATH) if MAKEFILE_PATH else None
     return {
         "makefile_path": str(MAKEFILE_PATH),
         "working_directory": str(WORKING_DIR),
-        "total_targets_in_makefile": (
-            len(MakefileParser(MAKEFILE_PATH).get_targets()) if MAKEFILE_PATH and MAKEFILE_PATH.exists() else 0
-        ),
+        "total_targets_in_makefile": (len(parser.get_targets()) if parser is not None else 0),
         "available_targets": len(filtered_targets),
         "targets": [
             {"name": name, "description": desc, "tool_name": make_tool_name(name)}
@@ -655,7 +796,8 @@ def get_makefile_info() -> Dict[str, Any]:
     Returns:
         dict: Comprehensive information about the Makefile.
     """
-    all_targets = MakefileParser(MAKEFILE_PATH).get_targets() if MAKEFILE_PATH and MAKEFILE_PATH.exists() else {}
+    parser = _cached_parser(MAKEFILE_PATH) if MAKEFILE_PATH else None
+    all_targets = parser.get_targets() if parser is not None else {}
 
     return {
         "makefile_path": str(MAKEFILE_PATH),
@@ -703,14 +845,21 @@ def get_output(execution_id: int, stream: str = "stdout", start_line: int = 0, e
         }
 
     text = cached.stdout if stream == "stdout" else cached.stderr
-    lines = text.splitlines(keepends=True)
-    total_lines = len(lines)
+    offsets = cached.line_offsets(stream)
+    total_lines = len(offsets) if not text or text.endswith("\n") else len(offsets) + 1
 
     # Clamp range
     start_line = max(0, start_line)
     end_line = max(start_line, min(end_line, total_lines))
 
-    selected = lines[start_line:end_line]
+    # Slice the requested lines straight out of the string via the offset
+    # index instead of splitting the whole output on every call.
+    if end_line == start_line:
+        content = ""
+    else:
+        start_pos = offsets[start_line - 1] + 1 if start_line else 0
+        end_pos = offsets[end_line - 1] + 1 if end_line - 1 < len(offsets) else len(text)
+        content = text[start_pos:end_pos]
 
     return {
         "status": "success",
@@ -720,11 +869,13 @@ def get_output(execution_id: int, stream: str = "stdout", start_line: int = 0, e
         "start_line": start_line,
         "end_line": end_line,
         "total_lines": total_lines,
-        "content": "".join(selected),
+        "content": content,
     }
 
 
-def search_output(execution_id: int, pattern: str, stream: str = "stdout", context_lines: int = 3) -> Dict[str, Any]:
+def search_output(
+    execution_id: int, pattern: str, stream: str = "stdout", context_lines: int = 3, regex: bool = False
+) -> Dict[str, Any]:
     """
     Search cached output from a previous make target execution.
 
@@ -733,6 +884,8 @@ def search_output(execution_id: int, pattern: str, stream: str = "stdout", conte
         pattern: Substring to search for (case-insensitive).
         stream: Which output stream to search — "stdout" or "stderr".
         context_lines: Number of surrounding lines to include with each match.
+        regex: Treat pattern as a regular expression instead of a substring.
+            Matching is case-insensitive and ^/$ anchor to individual lines.
 
     Returns:
         dict: Matching lines with context and line numbers.
@@ -751,12 +904,47 @@ def search_output(execution_id: int, pattern: str, stream: str = "stdout", conte
         }
 
     text = cached.stdout if stream == "stdout" else cached.stderr
-    lines = text.splitlines()
+    offsets = cached.line_offsets(stream)
+    lines = cached.lines(stream)
     total_lines = len(lines)
-    pattern_lower = pattern.lower()
 
-    # Find matching line indices
-    match_indices = [i for i, line in enumerate(lines) if pattern_lower in line.lower()]
+    # Match positions map back to line numbers through the offset index, and a
+    # line with several hits is reported once. Plain queries scan a casefolded
+    # copy of the stream with str.find, which is cheaper than the regex engine;
+    # regex=True keeps the compiled case-insensitive scan.
+    match_indices: List[int] = []
+    if regex:
+        try:
+            compiled = re.compile(pattern, re.IGNORECASE | re.MULTILINE)
+        except re.error as e:
+            return {
+                "status": "error",
+                "message": f"Invalid regex pattern '{pattern}': {e}",
+            }
+        for match in compiled.finditer(text):
+            line_number = bisect.bisect_left(offsets, match.start())
+            if line_number >= total_lines:
+                # ^, $ and \Z can match at end-of-stream after a trailing
+                # newline, past the last real line; there is nothing there.
+                continue
+            if not match_indices or match_indices[-1] != line_number:
+                match_indices.append(line_number)
+    else:
+        haystack = cached.casefolded(stream)
+        # Casefolding can change string length for some Unicode characters; the
+        # original offsets only map positions correctly when it did not.
+        haystack_offsets = offsets if len(haystack) == len(text) else _line_offsets(haystack)
+        needle = pattern.casefold()
+        step = len(needle) or 1
+        pos = haystack.find(needle)
+        while pos >= 0:
+            line_number = bisect.bisect_left(haystack_offsets, pos)
+            # An empty needle also finds the position just past a trailing
+            # newline, which maps beyond the last real line; skip it so an
+            # empty pattern matches every line, as the substring test would.
+            if line_number < total_lines and (not match_indices or match_indices[-1] != line_number):
+                match_indices.append(line_number)
+            pos = haystack.find(needle, pos + step)
 
     # Build matches with context
     matches: List[Dict[str, Any]] = []
@@ -791,18 +979,88 @@ mcp_server.tool()(get_output)
 mcp_server.tool()(search_output)
 
 
+def reset_for_test(argv: Optional[List[str]] = None) -> None:
+    """Rebind all mutable module state from an argument list, for tests.
+
+    Equivalent to deleting the module from sys.modules and re-importing it
+    under a patched sys.argv, without re-executing the module. argv is the
+    argument list without the program name, as for parse_cli_args.
+    """
+    global cli_args, MAKEFILE_PATH, WORKING_DIR, INCLUDE_TARGETS, EXCLUDE_TARGETS
+    global mcp_server, output_cache, filtered_targets
+
+    cli_args = parse_cli_args(argv=argv)
+    MAKEFILE_PATH = pathlib.Path(cli_args.makefile).resolve()
+
+    if cli_args.working_dir:
+        WORKING_DIR = pathlib.Path(cli_args.working_dir).resolve()
+    else:
+        WORKING_DIR = MAKEFILE_PATH.parent if MAKEFILE_PATH.exists() else pathlib.Path.cwd()
+
+    INCLUDE_TARGETS = parse_target_filter(cli_args.include)
+    EXCLUDE_TARGETS = parse_target_filter(cli_args.exclude) or frozenset()
+
+    # Fresh server and cache so registrations and execution IDs from a previous
+    # test cannot leak into the next one; the parse cache is keyed by stat
+    # signature, so it is cleared for tests that rewrite the same path in-place.
+    mcp_server = FastMCP("MakefileMCP")
+    output_cache = OutputCache(max_entries=cli_args.max_cached_executions)
+    filtered_targets = {}
+    _PARSE_CACHE.clear()
+
+
+def configure(
+    *,
+    makefile: Optional[str] = None,
+    include: Optional[str] = None,
+    exclude: Optional[str] = None,
+    working_dir: Optional[str] = None,
+    tail_lines: int = 50,
+    max_cached_executions: int = 20,
+) -> None:
+    """Programmatically configure module state, bypassing argv parsing.
+
+    A keyword mirror of the CLI options for embedding and tests: rebinds all
+    mutable state via reset_for_test, re-derives filtered_targets from the
+    configured Makefile when it exists, and registers the utility and
+    make-target tools on the fresh server so mcp_server is ready to run.
+    Raises ValueError if a target name collides with a utility tool, as
+    main() would report at startup.
+    """
+    global filtered_targets
+
+    argv: List[str] = ["--tail-lines", str(tail_lines), "--max-cached-executions", str(max_cached_executions)]
+    if makefile is not None:
+        argv += ["--makefile", str(makefile)]
+    if include is not None:
+        argv += ["--include", include]
+    if exclude is not None:
+        argv += ["--exclude", exclude]
+    if working_dir is not None:
+        argv += ["--working-dir", str(working_dir)]
+
+    reset_for_test(argv)
+
+    # reset_for_test swapped in a bare FastMCP instance; rebuild the tool set
+    # the import-time registrations and main() would have produced.
+    mcp_server.tool()(list_available_targets)
+    mcp_server.tool()(get_makefile_info)
+    mcp_server.tool()(get_output)
+    mcp_server.tool()(search_output)
+
+    if MAKEFILE_PATH.exists():
+        filtered_targets = get_makefile_targets()
+        register_make_tools(filtered_targets)
+
+
 def main():
     """Entry point for the Makefile MCP server."""
     global filtered_targets, cli_args, INCLUDE_TARGETS, EXCLUDE_TARGETS, output_cache
 
     cli_args = initialize_makefile_mcp()
 
-    INCLUDE_TARGETS = None
-    if cli_args.include:
-        INCLUDE_TARGETS = {target.strip() for target in cli_args.include.split(",")}
-    EXCLUDE_TARGETS = set()
-    if cli_args.exclude:
-        EXCLUDE_TARGETS = {target.strip() for target in cli_args.exclude.split(",")}
+    INCLUDE_TARGETS = parse_target_filter(cli_args.include)
+    EXCLUDE_TARGETS = parse_target_filter(cli_args.exclude) or frozenset()
 
     output_cache = OutputCache(max_entries=cli_args.max_cached_executions)
 
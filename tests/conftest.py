@@ -0,0 +1,30 @@
+"""Shared pytest fixtures for the Makefile MCP Server test suite."""
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def test_makefile(tmp_path_factory):
+    """A standard three-target Makefile written once and shared by the session.
+
+    Tests only ever read this file, so a single on-disk copy serves every test
+    that does not need bespoke Makefile content.
+    """
+    makefile_content = """# Build the project
+build:
+\techo "Building project..."
+
+# Run tests
+test:
+\techo "Running tests..."
+
+# Clean up
+clean:
+\techo "Cleaning up..."
+
+.PHONY: build test clean
+"""
+
+    makefile_path = tmp_path_factory.mktemp("makefiles") / "Makefile"
+    makefile_path.write_text(makefile_content)
+    return str(makefile_path)
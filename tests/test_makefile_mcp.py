@@ -13,7 +13,6 @@ import subprocess
 
 # Import the makefile MCP components
 import sys
-import tempfile
 import threading
 from unittest.mock import MagicMock, patch
 
@@ -25,7 +24,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 class TestMakefileParser:
     """Test the MakefileParser class functionality."""
 
-    def test_simple_makefile_parsing(self):
+    def test_simple_makefile_parsing(self, tmp_path):
         """Test parsing a simple Makefile with basic targets."""
         from makefile_mcp import MakefileParser
 
@@ -44,26 +43,21 @@ clean:
 .PHONY: build test clean
 """
 
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".mk", delete=False) as f:
-            f.write(makefile_content)
-            makefile_path = f.name
-
-        try:
-            parser = MakefileParser(pathlib.Path(makefile_path))
-            targets = parser.get_targets()
+        makefile_path = tmp_path / "Makefile"
+        makefile_path.write_text(makefile_content)
 
-            assert len(targets) == 3
-            assert "build" in targets
-            assert "test" in targets
-            assert "clean" in targets
-            assert targets["build"] == "Build the project"
-            assert targets["test"] == "Run tests"
-            assert targets["clean"] == "Clean up build artifacts"
+        parser = MakefileParser(makefile_path)
+        targets = parser.get_targets()
 
-        finally:
-            os.unlink(makefile_path)
+        assert len(targets) == 3
+        assert "build" in targets
+        assert "test" in targets
+        assert "clean" in targets
+        assert targets["build"] == "Build the project"
+        assert targets["test"] == "Run tests"
+        assert targets["clean"] == "Clean up build artifacts"
 
-    def test_targets_without_comments(self):
+    def test_targets_without_comments(self, tmp_path):
         """Test parsing targets that don't have comment descriptions."""
         from makefile_mcp import MakefileParser
 
@@ -78,22 +72,17 @@ install:
 	pip install -e .
 """
 
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".mk", delete=False) as f:
-            f.write(makefile_content)
-            makefile_path = f.name
-
-        try:
-            parser = MakefileParser(pathlib.Path(makefile_path))
-            targets = parser.get_targets()
+        makefile_path = tmp_path / "Makefile"
+        makefile_path.write_text(makefile_content)
 
-            assert targets["build"] == "Execute the 'build' target"  # Default description
-            assert targets["test"] == "This is a test target"  # From comment
-            assert targets["install"] == "Execute the 'install' target"  # Default description
+        parser = MakefileParser(makefile_path)
+        targets = parser.get_targets()
 
-        finally:
-            os.unlink(makefile_path)
+        assert targets["build"] == "Execute the 'build' target"  # Default description
+        assert targets["test"] == "This is a test target"  # From comment
+        assert targets["install"] == "Execute the 'install' target"  # Default description
 
-    def test_special_targets_ignored(self):
+    def test_special_targets_ignored(self, tmp_path):
         """Test that special targets (.PHONY, patterns) are ignored."""
         from makefile_mcp import MakefileParser
 
@@ -112,29 +101,24 @@ clean:
 .SUFFIXES: .c .o
 """
 
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".mk", delete=False) as f:
-            f.write(makefile_content)
-            makefile_path = f.name
-
-        try:
-            parser = MakefileParser(pathlib.Path(makefile_path))
-            targets = parser.get_targets()
+        makefile_path = tmp_path / "Makefile"
+        makefile_path.write_text(makefile_content)
 
-            # Should only include regular targets
-            assert len(targets) == 2
-            assert "all" in targets
-            assert "clean" in targets
+        parser = MakefileParser(makefile_path)
+        targets = parser.get_targets()
 
-            # Special targets should be excluded
-            assert ".PHONY" not in targets
-            assert ".DEFAULT_GOAL" not in targets
-            assert "%.o" not in targets
-            assert ".SUFFIXES" not in targets
+        # Should only include regular targets
+        assert len(targets) == 2
+        assert "all" in targets
+        assert "clean" in targets
 
-        finally:
-            os.unlink(makefile_path)
+        # Special targets should be excluded
+        assert ".PHONY" not in targets
+        assert ".DEFAULT_GOAL" not in targets
+        assert "%.o" not in targets
+        assert ".SUFFIXES" not in targets
 
-    def test_variable_assignments_not_targets(self):
+    def test_variable_assignments_not_targets(self, tmp_path):
         """Simply-expanded (:=) and ::= variable assignments must not be parsed as targets."""
         from makefile_mcp import MakefileParser
 
@@ -151,30 +135,25 @@ deps:
 \techo "deps"
 """
 
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".mk", delete=False) as f:
-            f.write(makefile_content)
-            makefile_path = f.name
+        makefile_path = tmp_path / "Makefile"
+        makefile_path.write_text(makefile_content)
 
-        try:
-            parser = MakefileParser(pathlib.Path(makefile_path))
-            targets = parser.get_targets()
+        parser = MakefileParser(makefile_path)
+        targets = parser.get_targets()
 
-            # Variable assignments should never become targets
-            assert "CC" not in targets
-            assert "PREFIX" not in targets
-            assert "OBJS" not in targets
-            assert "VERSION" not in targets
-            assert "CFLAGS" not in targets
+        # Variable assignments should never become targets
+        assert "CC" not in targets
+        assert "PREFIX" not in targets
+        assert "OBJS" not in targets
+        assert "VERSION" not in targets
+        assert "CFLAGS" not in targets
 
-            # Real targets are still discovered
-            assert "build" in targets
-            assert "deps" in targets
-            assert len(targets) == 2
+        # Real targets are still discovered
+        assert "build" in targets
+        assert "deps" in targets
+        assert len(targets) == 2
 
-        finally:
-            os.unlink(makefile_path)
-
-    def test_filtering_targets(self):
+    def test_filtering_targets(self, tmp_path):
         """Test include/exclude filtering of targets."""
         from makefile_mcp import MakefileParser
 
@@ -194,44 +173,58 @@ format:
 \tblack .
 """
 
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".mk", delete=False) as f:
-            f.write(makefile_content)
-            makefile_path = f.name
+        makefile_path = tmp_path / "Makefile"
+        makefile_path.write_text(makefile_content)
+
+        parser = MakefileParser(makefile_path)
+
+        # Test include filter
+        include_set = {"build", "test"}
+        filtered = parser.get_filtered_targets(include_set, set())
+        assert len(filtered) == 2
+        assert "build" in filtered
+        assert "test" in filtered
+        assert "clean" not in filtered
+
+        # Test exclude filter
+        exclude_set = {"deploy", "format"}
+        filtered = parser.get_filtered_targets(None, exclude_set)
+        assert len(filtered) == 3
+        assert "build" in filtered
+        assert "test" in filtered
+        assert "clean" in filtered
+        assert "deploy" not in filtered
+        assert "format" not in filtered
+
+        # Test both include and exclude
+        include_set = {"build", "test", "deploy"}
+        exclude_set = {"deploy"}
+        filtered = parser.get_filtered_targets(include_set, exclude_set)
+        assert len(filtered) == 2
+        assert "build" in filtered
+        assert "test" in filtered
+        assert "deploy" not in filtered
+
+    def test_duplicate_rules_keep_last_description_when_filtered(self, tmp_path):
+        """A target defined by several rules reports the same description everywhere."""
+        from makefile_mcp import MakefileParser
 
-        try:
-            parser = MakefileParser(pathlib.Path(makefile_path))
-
-            # Test include filter
-            include_set = {"build", "test"}
-            filtered = parser.get_filtered_targets(include_set, set())
-            assert len(filtered) == 2
-            assert "build" in filtered
-            assert "test" in filtered
-            assert "clean" not in filtered
-
-            # Test exclude filter
-            exclude_set = {"deploy", "format"}
-            filtered = parser.get_filtered_targets(None, exclude_set)
-            assert len(filtered) == 3
-            assert "build" in filtered
-            assert "test" in filtered
-            assert "clean" in filtered
-            assert "deploy" not in filtered
-            assert "format" not in filtered
-
-            # Test both include and exclude
-            include_set = {"build", "test", "deploy"}
-            exclude_set = {"deploy"}
-            filtered = parser.get_filtered_targets(include_set, exclude_set)
-            assert len(filtered) == 2
-            assert "build" in filtered
-            assert "test" in filtered
-            assert "deploy" not in filtered
+        makefile_content = """# Build everything
+all: compile
 
-        finally:
-            os.unlink(makefile_path)
+# Build and link everything
+all: link
+"""
+
+        makefile_path = tmp_path / "Makefile"
+        makefile_path.write_text(makefile_content)
+
+        parser = MakefileParser(makefile_path)
 
-    def test_complex_makefile_parsing(self):
+        assert parser.get_targets()["all"] == "Build and link everything"
+        assert parser.get_filtered_targets({"all"}, set())["all"] == "Build and link everything"
+
+    def test_complex_makefile_parsing(self, tmp_path):
         """Test parsing a more complex, realistic Makefile."""
         from makefile_mcp import MakefileParser
 
@@ -280,35 +273,30 @@ deploy: build
 .PHONY: setup install lint format test test-coverage build clean deploy
 """
 
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".mk", delete=False) as f:
-            f.write(makefile_content)
-            makefile_path = f.name
-
-        try:
-            parser = MakefileParser(pathlib.Path(makefile_path))
-            targets = parser.get_targets()
-
-            expected_targets = {
-                "setup": "Set up development environment",
-                "install": "Install dependencies",
-                "lint": "Run linting checks",
-                "format": "Format code",
-                "test": "Run the test suite",
-                "test-coverage": "Run tests with coverage",
-                "build": "Build the package",
-                "clean": "Clean build artifacts",
-                "deploy": "Deploy to PyPI",
-            }
-
-            assert len(targets) == len(expected_targets)
-            for target, expected_desc in expected_targets.items():
-                assert target in targets
-                assert targets[target] == expected_desc
-
-        finally:
-            os.unlink(makefile_path)
-
-    def test_multi_target_rule(self):
+        makefile_path = tmp_path / "Makefile"
+        makefile_path.write_text(makefile_content)
+
+        parser = MakefileParser(makefile_path)
+        targets = parser.get_targets()
+
+        expected_targets = {
+            "setup": "Set up development environment",
+            "install": "Install dependencies",
+            "lint": "Run linting checks",
+            "format": "Format code",
+            "test": "Run the test suite",
+            "test-coverage": "Run tests with coverage",
+            "build": "Build the package",
+            "clean": "Clean build artifacts",
+            "deploy": "Deploy to PyPI",
+        }
+
+        assert len(targets) == len(expected_targets)
+        for target, expected_desc in expected_targets.items():
+            assert target in targets
+            assert targets[target] == expected_desc
+
+    def test_multi_target_rule(self, tmp_path):
         """Rules declaring several targets on one line expose each as a target."""
         from makefile_mcp import MakefileParser
 
@@ -320,31 +308,26 @@ install uninstall: build
 \t@echo "$@"
 """
 
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".mk", delete=False) as f:
-            f.write(makefile_content)
-            makefile_path = f.name
-
-        try:
-            parser = MakefileParser(pathlib.Path(makefile_path))
-            targets = parser.get_targets()
+        makefile_path = tmp_path / "Makefile"
+        makefile_path.write_text(makefile_content)
 
-            # Every target on a multi-target rule is discovered.
-            for name in ("start", "stop", "restart", "install", "uninstall"):
-                assert name in targets
+        parser = MakefileParser(makefile_path)
+        targets = parser.get_targets()
 
-            # The preceding comment applies to each target on that rule.
-            assert targets["start"] == "Control the service"
-            assert targets["stop"] == "Control the service"
-            assert targets["restart"] == "Control the service"
+        # Every target on a multi-target rule is discovered.
+        for name in ("start", "stop", "restart", "install", "uninstall"):
+            assert name in targets
 
-            # A rule with no preceding comment gets a per-target default.
-            assert targets["install"] == "Execute the 'install' target"
-            assert targets["uninstall"] == "Execute the 'uninstall' target"
+        # The preceding comment applies to each target on that rule.
+        assert targets["start"] == "Control the service"
+        assert targets["stop"] == "Control the service"
+        assert targets["restart"] == "Control the service"
 
-        finally:
-            os.unlink(makefile_path)
+        # A rule with no preceding comment gets a per-target default.
+        assert targets["install"] == "Execute the 'install' target"
+        assert targets["uninstall"] == "Execute the 'uninstall' target"
 
-    def test_multi_target_rule_excludes_special_and_pattern(self):
+    def test_multi_target_rule_excludes_special_and_pattern(self, tmp_path):
         """Special targets on a multi-target rule are skipped while siblings are kept."""
         from makefile_mcp import MakefileParser
 
@@ -357,90 +340,58 @@ install uninstall: build
 CONFIG := build
 """
 
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".mk", delete=False) as f:
-            f.write(makefile_content)
-            makefile_path = f.name
-
-        try:
-            parser = MakefileParser(pathlib.Path(makefile_path))
-            targets = parser.get_targets()
+        makefile_path = tmp_path / "Makefile"
+        makefile_path.write_text(makefile_content)
 
-            # A dot-prefixed sibling on a multi-target rule is excluded; the
-            # ordinary sibling is still discovered.
-            assert "start" in targets
-            assert ".hidden" not in targets
+        parser = MakefileParser(makefile_path)
+        targets = parser.get_targets()
 
-            # Pattern rules and variable assignments remain excluded.
-            assert "%.o" not in targets
-            assert "CONFIG" not in targets
-            assert len(targets) == 1
+        # A dot-prefixed sibling on a multi-target rule is excluded; the
+        # ordinary sibling is still discovered.
+        assert "start" in targets
+        assert ".hidden" not in targets
 
-        finally:
-            os.unlink(makefile_path)
+        # Pattern rules and variable assignments remain excluded.
+        assert "%.o" not in targets
+        assert "CONFIG" not in targets
+        assert len(targets) == 1
 
 
 class TestMakefileMCPServer:
     """Test the MCP server functionality."""
 
-    @pytest.fixture
-    def test_makefile(self):
-        """Create a test Makefile for testing."""
-        makefile_content = """# Build the project
-build:
-\techo "Building project..."
-
-# Run tests
-test:
-\techo "Running tests..."
-
-# Clean up
-clean:
-\techo "Cleaning up..."
-
-.PHONY: build test clean
-"""
+    def test_make_tool_creation(self, test_makefile):
+        """Test that make tools are created correctly."""
+        import makefile_mcp
 
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".mk", delete=False) as f:
-            f.write(makefile_content)
-            f.flush()  # Ensure content is written to disk
-            yield f.name
+        makefile_mcp.configure(makefile=test_makefile)
 
-        os.unlink(f.name)
+        # Check that targets were parsed
+        assert len(makefile_mcp.filtered_targets) == 3
+        assert "build" in makefile_mcp.filtered_targets
+        assert "test" in makefile_mcp.filtered_targets
+        assert "clean" in makefile_mcp.filtered_targets
 
-    def test_make_tool_creation(self, test_makefile):
-        """Test that make tools are created correctly."""
-        # Mock the CLI args and reimport
-        with patch("sys.argv", ["makefile_mcp.py", "--makefile", test_makefile]):
-            # Clear the module cache
-            if "makefile_mcp" in sys.modules:
-                del sys.modules["makefile_mcp"]
+    def test_configure_registers_tools_on_fresh_server(self, test_makefile):
+        """configure() leaves mcp_server ready to run, not a bare instance."""
+        import asyncio
 
-            import makefile_mcp
+        import makefile_mcp
 
-            # Manually trigger target parsing with the test makefile
-            makefile_mcp.MAKEFILE_PATH = pathlib.Path(test_makefile)
-            makefile_mcp.WORKING_DIR = pathlib.Path(test_makefile).parent
-            makefile_mcp.INCLUDE_TARGETS = None  # Include all targets
-            makefile_mcp.EXCLUDE_TARGETS = set()  # Exclude nothing
-            makefile_mcp.filtered_targets = makefile_mcp.get_makefile_targets()
+        makefile_mcp.configure(makefile=test_makefile)
 
-            # Check that targets were parsed
-            assert len(makefile_mcp.filtered_targets) == 3
-            assert "build" in makefile_mcp.filtered_targets
-            assert "test" in makefile_mcp.filtered_targets
-            assert "clean" in makefile_mcp.filtered_targets
+        tool_names = {tool.name for tool in asyncio.run(makefile_mcp.mcp_server.list_tools())}
+        assert {"list_available_targets", "get_makefile_info", "get_output", "search_output"} <= tool_names
+        assert {"make_build", "make_test", "make_clean"} <= tool_names
 
     def test_startup_rejects_colliding_tool_names(self, tmp_path, capsys):
         """Startup rejects targets that normalize to the same tool name."""
         makefile_path = tmp_path / "Makefile"
         makefile_path.write_text("foo-bar:\n\techo hyphen\n\nfoo.bar:\n\techo period\n")
 
-        with patch("sys.argv", ["makefile_mcp.py", "--makefile", str(makefile_path)]):
-            if "makefile_mcp" in sys.modules:
-                del sys.modules["makefile_mcp"]
-
-            import makefile_mcp
+        import makefile_mcp
 
+        with patch("sys.argv", ["makefile_mcp.py", "--makefile", str(makefile_path)]):
             with patch.object(makefile_mcp, "create_make_tool") as create_make_tool:
                 with pytest.raises(SystemExit) as exc_info:
                     makefile_mcp.main()
@@ -466,12 +417,9 @@ clean:
             "--exclude",
             "test",
         ]
-        with patch("sys.argv", argv):
-            if "makefile_mcp" in sys.modules:
-                del sys.modules["makefile_mcp"]
-
-            import makefile_mcp
+        import makefile_mcp
 
+        with patch("sys.argv", argv):
             with patch.object(makefile_mcp.mcp_server, "run") as run:
                 makefile_mcp.main()
 
@@ -488,15 +436,13 @@ clean:
 
     def test_tool_name_normalization_is_shared(self, test_makefile):
         """Registration and target metadata use the same name generator."""
-        with patch("sys.argv", ["makefile_mcp.py", "--makefile", test_makefile]):
-            if "makefile_mcp" in sys.modules:
-                del sys.modules["makefile_mcp"]
+        import makefile_mcp
 
-            import makefile_mcp
+        makefile_mcp.configure(makefile=test_makefile)
 
-            makefile_mcp.filtered_targets = {"test-coverage.xml": "Coverage"}
-            tool = makefile_mcp.create_make_tool("test-coverage.xml", "Coverage")
-            listed_target = makefile_mcp.list_available_targets()["targets"][0]
+        makefile_mcp.filtered_targets = {"test-coverage.xml": "Coverage"}
+        tool = makefile_mcp.create_make_tool("test-coverage.xml", "Coverage")
+        listed_target = makefile_mcp.list_available_targets()["targets"][0]
 
         assert tool.__name__ == "make_test_coverage_xml"
         assert listed_target["tool_name"] == tool.__name__
@@ -511,32 +457,30 @@ clean:
         mock_result.stderr = ""
         mock_run.return_value = mock_result
 
-        with patch("sys.argv", ["makefile_mcp.py", "--makefile", test_makefile]):
-            if "makefile_mcp" in sys.modules:
-                del sys.modules["makefile_mcp"]
+        import makefile_mcp
 
-            import makefile_mcp
+        makefile_mcp.configure(makefile=test_makefile)
 
-            # Create a make tool for testing
-            make_tool = makefile_mcp.create_make_tool("build", "Build the project")
+        # Create a make tool for testing
+        make_tool = makefile_mcp.create_make_tool("build", "Build the project")
 
-            # Execute the tool
-            result = make_tool()
+        # Execute the tool
+        result = make_tool()
 
-            assert result["status"] == "success"
-            assert result["target"] == "build"
-            assert result["exit_code"] == 0
-            assert result["stdout_tail"] == "Building project...\n"
-            assert result["execution_id"] >= 1
-            assert result["stdout_total_lines"] == 1
-            assert result["stdout_total_chars"] == len("Building project...\n")
-            assert "Successfully executed target 'build'" in result["message"]
+        assert result["status"] == "success"
+        assert result["target"] == "build"
+        assert result["exit_code"] == 0
+        assert result["stdout_tail"] == "Building project...\n"
+        assert result["execution_id"] >= 1
+        assert result["stdout_total_lines"] == 1
+        assert result["stdout_total_chars"] == len("Building project...\n")
+        assert "Successfully executed target 'build'" in result["message"]
 
-            # Verify subprocess was called correctly
-            mock_run.assert_called_once()
-            call_args = mock_run.call_args[0][0]
-            assert "make" in call_args
-            assert "build" in call_args
+        # Verify subprocess was called correctly
+        mock_run.assert_called_once()
+        call_args = mock_run.call_args[0][0]
+        assert "make" in call_args
+        assert "build" in call_args
 
     @patch("subprocess.run")
     def test_make_tool_execution_failure(self, mock_run, test_makefile):
@@ -548,19 +492,17 @@ clean:
         mock_result.stderr = "make: *** No rule to make target 'invalid'. Stop.\n"
         mock_run.return_value = mock_result
 
-        with patch("sys.argv", ["makefile_mcp.py", "--makefile", test_makefile]):
-            if "makefile_mcp" in sys.modules:
-                del sys.modules["makefile_mcp"]
+        import makefile_mcp
 
-            import makefile_mcp
+        makefile_mcp.configure(makefile=test_makefile)
 
-            make_tool = makefile_mcp.create_make_tool("invalid", "Invalid target")
-            result = make_tool()
+        make_tool = makefile_mcp.create_make_tool("invalid", "Invalid target")
+        result = make_tool()
 
-            assert result["status"] == "error"
-            assert result["target"] == "invalid"
-            assert result["exit_code"] == 2
-            assert "failed with exit code 2" in result["message"]
+        assert result["status"] == "error"
+        assert result["target"] == "invalid"
+        assert result["exit_code"] == 2
+        assert "failed with exit code 2" in result["message"]
 
     @patch("subprocess.run")
     def test_make_tool_uses_custom_makefile(self, mock_run, tmp_path):
@@ -574,23 +516,12 @@ clean:
         mock_result = MagicMock(returncode=0, stdout="custom\n", stderr="")
         mock_run.return_value = mock_result
 
-        with patch(
-            "sys.argv",
-            [
-                "makefile_mcp.py",
-                "--makefile",
-                str(custom_makefile),
-                "--working-dir",
-                str(working_dir),
-            ],
-        ):
-            if "makefile_mcp" in sys.modules:
-                del sys.modules["makefile_mcp"]
+        import makefile_mcp
 
-            import makefile_mcp
+        makefile_mcp.configure(makefile=str(custom_makefile), working_dir=str(working_dir))
 
-            make_tool = makefile_mcp.create_make_tool("custom", "Run custom target")
-            result = make_tool()
+        make_tool = makefile_mcp.create_make_tool("custom", "Run custom target")
+        result = make_tool()
 
         expected_command = ["make", "-C", str(working_dir), "-f", str(custom_makefile), "custom"]
         mock_run.assert_called_once_with(expected_command, capture_output=True, text=True, timeout=300)
@@ -605,21 +536,19 @@ clean:
         mock_result.stderr = ""
         mock_run.return_value = mock_result
 
-        with patch("sys.argv", ["makefile_mcp.py", "--makefile", test_makefile]):
-            if "makefile_mcp" in sys.modules:
-                del sys.modules["makefile_mcp"]
+        import makefile_mcp
 
-            import makefile_mcp
+        makefile_mcp.configure(makefile=test_makefile)
 
-            make_tool = makefile_mcp.create_make_tool("build", "Build the project")
-            result = make_tool(dry_run=True)
+        make_tool = makefile_mcp.create_make_tool("build", "Build the project")
+        result = make_tool(dry_run=True)
 
-            assert result["status"] == "success"
-            assert result["note"] == "This was a dry run - no commands were actually executed"
+        assert result["status"] == "success"
+        assert result["note"] == "This was a dry run - no commands were actually executed"
 
-            # Verify -n flag was added for dry run
-            call_args = mock_run.call_args[0][0]
-            assert "-n" in call_args
+        # Verify -n flag was added for dry run
+        call_args = mock_run.call_args[0][0]
+        assert "-n" in call_args
 
     @patch("subprocess.run")
     def test_make_tool_with_additional_args(self, mock_run, test_makefile):
@@ -630,56 +559,50 @@ clean:
         mock_result.stderr = ""
         mock_run.return_value = mock_result
 
-        with patch("sys.argv", ["makefile_mcp.py", "--makefile", test_makefile]):
-            if "makefile_mcp" in sys.modules:
-                del sys.modules["makefile_mcp"]
+        import makefile_mcp
 
-            import makefile_mcp
+        makefile_mcp.configure(makefile=test_makefile)
 
-            make_tool = makefile_mcp.create_make_tool("test", "Run tests")
-            result = make_tool(additional_args="-j4 VERBOSE=1")
+        make_tool = makefile_mcp.create_make_tool("test", "Run tests")
+        result = make_tool(additional_args="-j4 VERBOSE=1")
 
-            assert result["status"] == "success"
+        assert result["status"] == "success"
 
-            call_args = mock_run.call_args[0][0]
-            assert call_args[-2:] == ["-j4", "VERBOSE=1"]
+        call_args = mock_run.call_args[0][0]
+        assert call_args[-2:] == ["-j4", "VERBOSE=1"]
 
     @patch("subprocess.run")
     def test_make_tool_additional_args_preserve_quoting(self, mock_run, test_makefile):
         """Quoted values and escaped spaces stay a single argument."""
         mock_run.return_value = MagicMock(returncode=0, stdout="", stderr="")
 
-        with patch("sys.argv", ["makefile_mcp.py", "--makefile", test_makefile]):
-            if "makefile_mcp" in sys.modules:
-                del sys.modules["makefile_mcp"]
+        import makefile_mcp
 
-            import makefile_mcp
+        makefile_mcp.configure(makefile=test_makefile)
 
-            make_tool = makefile_mcp.create_make_tool("test", "Run tests")
-            result = make_tool(additional_args='MESSAGE="hello world" PATH_ARG=my\\ file.txt -j4')
+        make_tool = makefile_mcp.create_make_tool("test", "Run tests")
+        result = make_tool(additional_args='MESSAGE="hello world" PATH_ARG=my\\ file.txt -j4')
 
-            assert result["status"] == "success"
+        assert result["status"] == "success"
 
-            call_args = mock_run.call_args[0][0]
-            assert call_args[-3:] == ["MESSAGE=hello world", "PATH_ARG=my file.txt", "-j4"]
+        call_args = mock_run.call_args[0][0]
+        assert call_args[-3:] == ["MESSAGE=hello world", "PATH_ARG=my file.txt", "-j4"]
 
     @patch("subprocess.run")
     def test_make_tool_invalid_additional_args(self, mock_run, test_makefile):
         """Malformed quoting is reported as an error without invoking make."""
-        with patch("sys.argv", ["makefile_mcp.py", "--makefile", test_makefile]):
-            if "makefile_mcp" in sys.modules:
-                del sys.modules["makefile_mcp"]
+        import makefile_mcp
 
-            import makefile_mcp
+        makefile_mcp.configure(makefile=test_makefile)
 
-            make_tool = makefile_mcp.create_make_tool("test", "Run tests")
-            result = make_tool(additional_args='MESSAGE="unclosed')
+        make_tool = makefile_mcp.create_make_tool("test", "Run tests")
+        result = make_tool(additional_args='MESSAGE="unclosed')
 
-            assert result["status"] == "error"
-            assert result["target"] == "test"
-            assert result["exit_code"] == -1
-            assert "Invalid additional_args" in result["message"]
-            mock_run.assert_not_called()
+        assert result["status"] == "error"
+        assert result["target"] == "test"
+        assert result["exit_code"] == -1
+        assert "Invalid additional_args" in result["message"]
+        mock_run.assert_not_called()
 
     @pytest.mark.parametrize(
         "additional_args",
@@ -711,20 +634,18 @@ clean:
     @patch("subprocess.run")
     def test_make_tool_rejects_boundary_bypass_args(self, mock_run, additional_args, test_makefile):
         """Target/makefile/directory/eval bypass attempts never reach subprocess.run."""
-        with patch("sys.argv", ["makefile_mcp.py", "--makefile", test_makefile]):
-            if "makefile_mcp" in sys.modules:
-                del sys.modules["makefile_mcp"]
+        import makefile_mcp
 
-            import makefile_mcp
+        makefile_mcp.configure(makefile=test_makefile)
 
-            make_tool = makefile_mcp.create_make_tool("safe", "Run the safe target")
-            result = make_tool(additional_args=additional_args)
+        make_tool = makefile_mcp.create_make_tool("safe", "Run the safe target")
+        result = make_tool(additional_args=additional_args)
 
-            assert result["status"] == "error"
-            assert result["target"] == "safe"
-            assert result["exit_code"] == -1
-            assert "Rejected additional_args" in result["message"]
-            mock_run.assert_not_called()
+        assert result["status"] == "error"
+        assert result["target"] == "safe"
+        assert result["exit_code"] == -1
+        assert "Rejected additional_args" in result["message"]
+        mock_run.assert_not_called()
 
     @pytest.mark.parametrize(
         ("additional_args", "expected_tail"),
@@ -747,19 +668,17 @@ clean:
         """Safe execution flags and variable assignments still reach make unchanged."""
         mock_run.return_value = MagicMock(returncode=0, stdout="", stderr="")
 
-        with patch("sys.argv", ["makefile_mcp.py", "--makefile", test_makefile]):
-            if "makefile_mcp" in sys.modules:
-                del sys.modules["makefile_mcp"]
+        import makefile_mcp
 
-            import makefile_mcp
+        makefile_mcp.configure(makefile=test_makefile)
 
-            make_tool = makefile_mcp.create_make_tool("safe", "Run the safe target")
-            result = make_tool(additional_args=additional_args)
+        make_tool = makefile_mcp.create_make_tool("safe", "Run the safe target")
+        result = make_tool(additional_args=additional_args)
 
-            assert result["status"] == "success"
+        assert result["status"] == "success"
 
-            call_args = mock_run.call_args[0][0]
-            assert call_args[-len(expected_tail) :] == expected_tail
+        call_args = mock_run.call_args[0][0]
+        assert call_args[-len(expected_tail) :] == expected_tail
 
     @pytest.mark.parametrize(
         ("additional_args", "expected_fragment"),
@@ -772,72 +691,52 @@ clean:
     @patch("subprocess.run")
     def test_make_tool_rejection_names_the_expansion(self, mock_run, additional_args, expected_fragment, test_makefile):
         """The rejection is specific, not the closure's generic unexpected-error fallback."""
-        with patch("sys.argv", ["makefile_mcp.py", "--makefile", test_makefile]):
-            if "makefile_mcp" in sys.modules:
-                del sys.modules["makefile_mcp"]
+        import makefile_mcp
 
-            import makefile_mcp
+        makefile_mcp.configure(makefile=test_makefile)
 
-            make_tool = makefile_mcp.create_make_tool("safe", "Run the safe target")
-            result = make_tool(additional_args=additional_args)
+        make_tool = makefile_mcp.create_make_tool("safe", "Run the safe target")
+        result = make_tool(additional_args=additional_args)
 
-            assert result["status"] == "error"
-            assert result["exit_code"] == -1
-            assert "Rejected additional_args" in result["message"]
-            assert expected_fragment in result["message"]
-            assert "Unexpected error" not in result["message"]
-            mock_run.assert_not_called()
+        assert result["status"] == "error"
+        assert result["exit_code"] == -1
+        assert "Rejected additional_args" in result["message"]
+        assert expected_fragment in result["message"]
+        assert "Unexpected error" not in result["message"]
+        mock_run.assert_not_called()
 
     def test_list_available_targets_tool(self, test_makefile):
         """Test the list_available_targets tool."""
-        with patch("sys.argv", ["makefile_mcp.py", "--makefile", test_makefile]):
-            if "makefile_mcp" in sys.modules:
-                del sys.modules["makefile_mcp"]
-
-            import makefile_mcp
+        import makefile_mcp
 
-            # Manually trigger target parsing with the test makefile
-            makefile_mcp.MAKEFILE_PATH = pathlib.Path(test_makefile)
-            makefile_mcp.WORKING_DIR = pathlib.Path(test_makefile).parent
-            makefile_mcp.INCLUDE_TARGETS = None  # Include all targets
-            makefile_mcp.EXCLUDE_TARGETS = set()  # Exclude nothing
-            makefile_mcp.filtered_targets = makefile_mcp.get_makefile_targets()
+        makefile_mcp.configure(makefile=test_makefile)
 
-            result = makefile_mcp.list_available_targets()
+        result = makefile_mcp.list_available_targets()
 
-            assert "makefile_path" in result
-            assert "working_directory" in result
-            assert "available_targets" in result
-            assert result["available_targets"] == 3
-            assert "targets" in result
+        assert "makefile_path" in result
+        assert "working_directory" in result
+        assert "available_targets" in result
+        assert result["available_targets"] == 3
+        assert "targets" in result
 
-            target_names = [t["name"] for t in result["targets"]]
-            assert "build" in target_names
-            assert "test" in target_names
-            assert "clean" in target_names
+        target_names = [t["name"] for t in result["targets"]]
+        assert "build" in target_names
+        assert "test" in target_names
+        assert "clean" in target_names
 
     def test_get_makefile_info_tool(self, test_makefile):
         """Test the get_makefile_info tool."""
-        with patch("sys.argv", ["makefile_mcp.py", "--makefile", test_makefile]):
-            if "makefile_mcp" in sys.modules:
-                del sys.modules["makefile_mcp"]
+        import makefile_mcp
 
-            import makefile_mcp
+        makefile_mcp.configure(makefile=test_makefile)
 
-            # Manually trigger target parsing with the test makefile
-            makefile_mcp.MAKEFILE_PATH = pathlib.Path(test_makefile)
-            makefile_mcp.WORKING_DIR = pathlib.Path(test_makefile).parent
-            makefile_mcp.INCLUDE_TARGETS = None  # Include all targets
-            makefile_mcp.EXCLUDE_TARGETS = set()  # Exclude nothing
-            makefile_mcp.filtered_targets = makefile_mcp.get_makefile_targets()
+        result = makefile_mcp.get_makefile_info()
 
-            result = makefile_mcp.get_makefile_info()
-
-            assert result["makefile_exists"] is True
-            assert result["all_targets"]["count"] == 3
-            assert result["filtered_targets"]["count"] == 3
-            assert result["filters"]["include"] is None
-            assert result["filters"]["exclude"] is None
+        assert result["makefile_exists"] is True
+        assert result["all_targets"]["count"] == 3
+        assert result["filtered_targets"]["count"] == 3
+        assert result["filters"]["include"] is None
+        assert result["filters"]["exclude"] is None
 
 
 class TestCommandLineArguments:
@@ -845,76 +744,46 @@ class TestCommandLineArguments:
 
     def test_include_filter(self):
         """Test --include command line argument."""
-        test_args = ["makefile_mcp.py", "--include", "build,test"]
-
-        with patch("sys.argv", test_args):
-            if "makefile_mcp" in sys.modules:
-                del sys.modules["makefile_mcp"]
+        from makefile_mcp import parse_cli_args
 
-            # Just test the arg parsing function directly
-            from makefile_mcp import parse_cli_args
+        args = parse_cli_args(argv=["--include", "build,test"])
 
-            args = parse_cli_args()
-
-            assert args.include == "build,test"
-            assert args.exclude is None
+        assert args.include == "build,test"
+        assert args.exclude is None
 
     def test_exclude_filter(self):
         """Test --exclude command line argument."""
-        test_args = ["makefile_mcp.py", "--exclude", "clean,deploy"]
+        from makefile_mcp import parse_cli_args
 
-        with patch("sys.argv", test_args):
-            if "makefile_mcp" in sys.modules:
-                del sys.modules["makefile_mcp"]
+        args = parse_cli_args(argv=["--exclude", "clean,deploy"])
 
-            from makefile_mcp import parse_cli_args
-
-            args = parse_cli_args()
-
-            assert args.exclude == "clean,deploy"
-            assert args.include is None
+        assert args.exclude == "clean,deploy"
+        assert args.include is None
 
     def test_custom_makefile_path(self):
         """Test --makefile command line argument."""
-        test_args = ["makefile_mcp.py", "--makefile", "/custom/path/Makefile"]
+        from makefile_mcp import parse_cli_args
 
-        with patch("sys.argv", test_args):
-            if "makefile_mcp" in sys.modules:
-                del sys.modules["makefile_mcp"]
+        args = parse_cli_args(argv=["--makefile", "/custom/path/Makefile"])
 
-            from makefile_mcp import parse_cli_args
-
-            args = parse_cli_args()
-
-            assert args.makefile == "/custom/path/Makefile"
+        assert args.makefile == "/custom/path/Makefile"
 
     def test_working_directory(self):
         """Test --working-dir command line argument."""
-        test_args = ["makefile_mcp.py", "--working-dir", "/custom/work/dir"]
-
-        with patch("sys.argv", test_args):
-            if "makefile_mcp" in sys.modules:
-                del sys.modules["makefile_mcp"]
+        from makefile_mcp import parse_cli_args
 
-            from makefile_mcp import parse_cli_args
+        args = parse_cli_args(argv=["--working-dir", "/custom/work/dir"])
 
-            args = parse_cli_args()
-
-            assert args.working_dir == "/custom/work/dir"
+        assert args.working_dir == "/custom/work/dir"
 
     @pytest.mark.parametrize("option", ["--max-cached-executions", "--tail-lines"])
     @pytest.mark.parametrize("value", ["0", "-1"])
     def test_output_limits_must_be_positive(self, option, value, capsys):
         """Test output limits reject zero and negative values."""
-        with patch("sys.argv", ["makefile_mcp.py"]):
-            if "makefile_mcp" in sys.modules:
-                del sys.modules["makefile_mcp"]
-
-            from makefile_mcp import parse_cli_args
+        from makefile_mcp import parse_cli_args
 
-        with patch("sys.argv", ["makefile_mcp.py", option, value]):
-            with pytest.raises(SystemExit) as exc_info:
-                parse_cli_args()
+        with pytest.raises(SystemExit) as exc_info:
+            parse_cli_args(argv=[option, value])
 
         assert exc_info.value.code == 2
         error = capsys.readouterr().err
@@ -923,15 +792,9 @@ class TestCommandLineArguments:
 
     def test_positive_output_limits_are_accepted(self):
         """Test positive custom output limits are preserved."""
-        test_args = ["makefile_mcp.py", "--max-cached-executions", "3", "--tail-lines", "5"]
+        from makefile_mcp import parse_cli_args
 
-        with patch("sys.argv", test_args):
-            if "makefile_mcp" in sys.modules:
-                del sys.modules["makefile_mcp"]
-
-            from makefile_mcp import parse_cli_args
-
-            args = parse_cli_args()
+        args = parse_cli_args(argv=["--max-cached-executions", "3", "--tail-lines", "5"])
 
         assert args.max_cached_executions == 3
         assert args.tail_lines == 5
@@ -972,74 +835,50 @@ class TestErrorHandling:
     """Test error handling scenarios."""
 
     @patch("subprocess.run")
-    def test_subprocess_timeout(self, mock_run):
+    def test_subprocess_timeout(self, mock_run, test_makefile):
         """Test handling of subprocess timeout."""
         mock_run.side_effect = subprocess.TimeoutExpired("make", 300)
 
-        # Create a temporary makefile for this test
-        makefile_content = "test:\n\techo 'test'"
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".mk", delete=False) as f:
-            f.write(makefile_content)
-            makefile_path = f.name
+        import makefile_mcp
 
-        try:
-            with patch("sys.argv", ["makefile_mcp.py", "--makefile", makefile_path]):
-                if "makefile_mcp" in sys.modules:
-                    del sys.modules["makefile_mcp"]
+        makefile_mcp.configure(makefile=test_makefile)
 
-                import makefile_mcp
+        make_tool = makefile_mcp.create_make_tool("test", "Test target")
+        result = make_tool()
 
-                make_tool = makefile_mcp.create_make_tool("test", "Test target")
-                result = make_tool()
-
-                assert result["status"] == "error"
-                assert "timed out" in result["message"]
-                assert result["exit_code"] == -1
-        finally:
-            os.unlink(makefile_path)
+        assert result["status"] == "error"
+        assert "timed out" in result["message"]
+        assert result["exit_code"] == -1
 
     @patch("subprocess.run")
-    def test_subprocess_error(self, mock_run):
+    def test_subprocess_error(self, mock_run, test_makefile):
         """Test handling of subprocess errors."""
         mock_run.side_effect = subprocess.SubprocessError("Command failed")
 
-        makefile_content = "test:\n\techo 'test'"
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".mk", delete=False) as f:
-            f.write(makefile_content)
-            makefile_path = f.name
-
-        try:
-            with patch("sys.argv", ["makefile_mcp.py", "--makefile", makefile_path]):
-                if "makefile_mcp" in sys.modules:
-                    del sys.modules["makefile_mcp"]
+        import makefile_mcp
 
-                import makefile_mcp
+        makefile_mcp.configure(makefile=test_makefile)
 
-                make_tool = makefile_mcp.create_make_tool("test", "Test target")
-                result = make_tool()
+        make_tool = makefile_mcp.create_make_tool("test", "Test target")
+        result = make_tool()
 
-                assert result["status"] == "error"
-                assert "Failed to execute" in result["message"]
-                assert result["exit_code"] == -1
-        finally:
-            os.unlink(makefile_path)
+        assert result["status"] == "error"
+        assert "Failed to execute" in result["message"]
+        assert result["exit_code"] == -1
 
 
 class TestTimeoutPartialOutput:
     """Test that partial output captured before a timeout is preserved."""
 
     def _run_timed_out_target(self, tmp_path, timeout_error, extra_argv=()):
-        """Import a fresh module, run a target that times out, return (module, result)."""
+        """Reset module state, run a target that times out, return (module, result)."""
         makefile = tmp_path / "Makefile"
         makefile.write_text("slow:\n\tsleep 600\n")
 
-        argv = ["makefile_mcp.py", "--makefile", str(makefile), *extra_argv]
-        with patch("subprocess.run", side_effect=timeout_error), patch("sys.argv", argv):
-            if "makefile_mcp" in sys.modules:
-                del sys.modules["makefile_mcp"]
-
-            import makefile_mcp
+        import makefile_mcp
 
+        makefile_mcp.reset_for_test(["--makefile", str(makefile), *extra_argv])
+        with patch("subprocess.run", side_effect=timeout_error):
             make_tool = makefile_mcp.create_make_tool("slow", "Slow target")
             return makefile_mcp, make_tool()
 
@@ -1269,16 +1108,15 @@ class TestTailTruncation:
         mock_result.stderr = ""
         mock_run.return_value = mock_result
 
-        with patch("sys.argv", ["makefile_mcp.py", "--tail-lines", "50"]):
-            if "makefile_mcp" in sys.modules:
-                del sys.modules["makefile_mcp"]
-            import makefile_mcp
+        import makefile_mcp
 
-            make_tool = makefile_mcp.create_make_tool("build", "Build")
-            result = make_tool()
+        makefile_mcp.configure(tail_lines=50)
 
-            assert result["stdout_tail"] == "line1\nline2\nline3\n"
-            assert "truncation_note" not in result
+        make_tool = makefile_mcp.create_make_tool("build", "Build")
+        result = make_tool()
+
+        assert result["stdout_tail"] == "line1\nline2\nline3\n"
+        assert "truncation_note" not in result
 
     @patch("subprocess.run")
     def test_long_output_truncated(self, mock_run):
@@ -1292,23 +1130,22 @@ class TestTailTruncation:
         mock_result.stderr = ""
         mock_run.return_value = mock_result
 
-        with patch("sys.argv", ["makefile_mcp.py", "--tail-lines", "5"]):
-            if "makefile_mcp" in sys.modules:
-                del sys.modules["makefile_mcp"]
-            import makefile_mcp
+        import makefile_mcp
 
-            make_tool = makefile_mcp.create_make_tool("build", "Build")
-            result = make_tool()
+        makefile_mcp.configure(tail_lines=5)
 
-            # Should only have the last 5 lines
-            tail_lines = result["stdout_tail"].splitlines()
-            assert len(tail_lines) == 5
-            assert tail_lines[0] == "line95"
-            assert tail_lines[4] == "line99"
+        make_tool = makefile_mcp.create_make_tool("build", "Build")
+        result = make_tool()
 
-            assert result["stdout_total_lines"] == 100
-            assert "truncation_note" in result
-            assert "get_output" in result["truncation_note"]
+        # Should only have the last 5 lines
+        tail_lines = result["stdout_tail"].splitlines()
+        assert len(tail_lines) == 5
+        assert tail_lines[0] == "line95"
+        assert tail_lines[4] == "line99"
+
+        assert result["stdout_total_lines"] == 100
+        assert "truncation_note" in result
+        assert "get_output" in result["truncation_note"]
 
     @patch("subprocess.run")
     def test_execution_id_in_response(self, mock_run):
@@ -1319,15 +1156,14 @@ class TestTailTruncation:
         mock_result.stderr = ""
         mock_run.return_value = mock_result
 
-        with patch("sys.argv", ["makefile_mcp.py"]):
-            if "makefile_mcp" in sys.modules:
-                del sys.modules["makefile_mcp"]
-            import makefile_mcp
+        import makefile_mcp
 
-            make_tool = makefile_mcp.create_make_tool("test", "Test")
-            result = make_tool()
-            assert "execution_id" in result
-            assert isinstance(result["execution_id"], int)
+        makefile_mcp.configure()
+
+        make_tool = makefile_mcp.create_make_tool("test", "Test")
+        result = make_tool()
+        assert "execution_id" in result
+        assert isinstance(result["execution_id"], int)
 
 
 class TestGetOutput:
@@ -1335,16 +1171,15 @@ class TestGetOutput:
 
     def _setup(self):
         """Set up a module with cached output."""
-        with patch("sys.argv", ["makefile_mcp.py"]):
-            if "makefile_mcp" in sys.modules:
-                del sys.modules["makefile_mcp"]
-            import makefile_mcp
+        import makefile_mcp
+
+        makefile_mcp.configure()
 
-            # Directly add to cache
-            lines = [f"line{i}" for i in range(20)]
-            full_output = "\n".join(lines) + "\n"
-            entry = makefile_mcp.output_cache.add("test", "make test", full_output, "err0\nerr1\n", 0)
-            return makefile_mcp, entry.execution_id
+        # Directly add to cache
+        lines = [f"line{i}" for i in range(20)]
+        full_output = "\n".join(lines) + "\n"
+        entry = makefile_mcp.output_cache.add("test", "make test", full_output, "err0\nerr1\n", 0)
+        return makefile_mcp, entry.execution_id
 
     def test_basic_pagination(self):
         """Test retrieving a range of lines."""
@@ -1402,14 +1237,13 @@ class TestSearchOutput:
 
     def _setup(self):
         """Set up a module with cached output."""
-        with patch("sys.argv", ["makefile_mcp.py"]):
-            if "makefile_mcp" in sys.modules:
-                del sys.modules["makefile_mcp"]
-            import makefile_mcp
+        import makefile_mcp
+
+        makefile_mcp.configure()
 
-            output = "Starting build\nCompiling main.c\nWARNING: deprecated function\nCompiling util.c\nLinking...\nWARNING: unused variable\nBuild complete\n"
-            entry = makefile_mcp.output_cache.add("build", "make build", output, "", 0)
-            return makefile_mcp, entry.execution_id
+        output = "Starting build\nCompiling main.c\nWARNING: deprecated function\nCompiling util.c\nLinking...\nWARNING: unused variable\nBuild complete\n"
+        entry = makefile_mcp.output_cache.add("build", "make build", output, "", 0)
+        return makefile_mcp, entry.execution_id
 
     def test_basic_search(self):
         """Test basic substring search."""
@@ -1441,6 +1275,75 @@ class TestSearchOutput:
         assert context[1]["is_match"] is True
         assert context[2]["is_match"] is False
 
+    def test_empty_pattern_matches_every_line(self):
+        """An empty pattern is a substring of every line."""
+        makefile_mcp, eid = self._setup()
+        result = makefile_mcp.search_output(eid, "")
+
+        assert result["status"] == "success"
+        assert result["total_matches"] == 7
+        assert [m["line_number"] for m in result["matches"]] == list(range(7))
+
+    def test_empty_pattern_on_empty_stream(self):
+        """An empty pattern against an empty stream reports zero matches."""
+        makefile_mcp, eid = self._setup()
+        result = makefile_mcp.search_output(eid, "", stream="stderr")
+
+        assert result["status"] == "success"
+        assert result["total_matches"] == 0
+
+    def test_regex_search(self):
+        """Test regex=True treats the pattern as a regular expression."""
+        makefile_mcp, eid = self._setup()
+        result = makefile_mcp.search_output(eid, r"Compiling \w+\.c", regex=True)
+
+        assert result["status"] == "success"
+        assert result["total_matches"] == 2
+        assert result["matches"][0]["line_number"] == 1
+        assert result["matches"][1]["line_number"] == 3
+
+    def test_regex_anchors_match_line_boundaries(self):
+        """^ and $ in a regex pattern anchor to individual lines, not the whole stream."""
+        makefile_mcp, eid = self._setup()
+        result = makefile_mcp.search_output(eid, r"^Linking\.\.\.$", regex=True)
+
+        assert result["status"] == "success"
+        assert result["total_matches"] == 1
+        assert result["matches"][0]["line_number"] == 4
+
+    def test_regex_blank_line_pattern(self):
+        """^$ matches real blank lines, not the end of a newline-terminated stream."""
+        import makefile_mcp
+
+        makefile_mcp.configure()
+        entry = makefile_mcp.output_cache.add("build", "make build", "a\n\nb\n", "", 0)
+        result = makefile_mcp.search_output(entry.execution_id, r"^$", regex=True)
+
+        assert result["status"] == "success"
+        assert result["total_matches"] == 1
+        assert result["matches"][0]["line_number"] == 1
+
+    def test_regex_end_anchor_stops_at_last_line(self):
+        """A bare $ matches once per line and nothing past the trailing newline."""
+        makefile_mcp, eid = self._setup()
+        result = makefile_mcp.search_output(eid, r"$", regex=True)
+
+        assert result["status"] == "success"
+        assert result["total_matches"] == 7
+
+    def test_regex_metacharacters_are_literal_by_default(self):
+        """Without regex=True, metacharacters in the pattern match literally."""
+        makefile_mcp, eid = self._setup()
+        result = makefile_mcp.search_output(eid, r"Compiling \w+\.c")
+        assert result["total_matches"] == 0
+
+    def test_invalid_regex(self):
+        """Test error for an unparseable regex pattern."""
+        makefile_mcp, eid = self._setup()
+        result = makefile_mcp.search_output(eid, "unclosed(", regex=True)
+        assert result["status"] == "error"
+        assert "Invalid regex pattern" in result["message"]
+
     def test_no_matches(self):
         """Test search with no results."""
         makefile_mcp, eid = self._setup()
@@ -1457,15 +1360,14 @@ class TestSearchOutput:
 
     def test_search_stderr(self):
         """Test searching stderr stream."""
-        with patch("sys.argv", ["makefile_mcp.py"]):
-            if "makefile_mcp" in sys.modules:
-                del sys.modules["makefile_mcp"]
-            import makefile_mcp
+        import makefile_mcp
 
-            entry = makefile_mcp.output_cache.add("t", "make t", "", "error: foo\nwarning: bar\n", 1)
-            result = makefile_mcp.search_output(entry.execution_id, "error", stream="stderr")
-            assert result["total_matches"] == 1
-            assert result["matches"][0]["line_number"] == 0
+        makefile_mcp.configure()
+
+        entry = makefile_mcp.output_cache.add("t", "make t", "", "error: foo\nwarning: bar\n", 1)
+        result = makefile_mcp.search_output(entry.execution_id, "error", stream="stderr")
+        assert result["total_matches"] == 1
+        assert result["matches"][0]["line_number"] == 0
 
     def test_line_numbers_for_followup(self):
         """Test that match line numbers can be used with get_output."""
@@ -1613,14 +1515,12 @@ class TestRealMakeExpansionRegression:
     )
     def test_project_path_never_executes_the_assignment(self, harness, additional_args):
         """The same input through the generated tool is rejected and runs no command."""
-        with patch("sys.argv", ["makefile_mcp.py", "--makefile", str(harness)]):
-            if "makefile_mcp" in sys.modules:
-                del sys.modules["makefile_mcp"]
+        import makefile_mcp
 
-            import makefile_mcp
+        makefile_mcp.configure(makefile=str(harness))
 
-            make_tool = makefile_mcp.create_make_tool("safe", "Run the safe target")
-            result = make_tool(additional_args=additional_args)
+        make_tool = makefile_mcp.create_make_tool("safe", "Run the safe target")
+        result = make_tool(additional_args=additional_args)
 
         # The marker assertion carries the security claim, so it runs before the
         # weaker response-shape assertions and cannot be masked by them.
@@ -1630,14 +1530,12 @@ class TestRealMakeExpansionRegression:
 
     def test_literal_assignment_still_reaches_real_make(self, harness):
         """A plain value is not collateral damage: it runs and stays a single argv token."""
-        with patch("sys.argv", ["makefile_mcp.py", "--makefile", str(harness)]):
-            if "makefile_mcp" in sys.modules:
-                del sys.modules["makefile_mcp"]
+        import makefile_mcp
 
-            import makefile_mcp
+        makefile_mcp.configure(makefile=str(harness))
 
-            make_tool = makefile_mcp.create_make_tool("safe", "Run the safe target")
-            result = make_tool(additional_args='VERBOSE=1 MESSAGE="hello world"')
+        make_tool = makefile_mcp.create_make_tool("safe", "Run the safe target")
+        result = make_tool(additional_args='VERBOSE=1 MESSAGE="hello world"')
 
         assert result["status"] == "success"
         assert "safe target ran" in result["stdout_tail"]